@@ -2,52 +2,83 @@
 # This program was done for testing and development purposes. Can be deleted at some point.
 # The production code is in src/gl_to_excel_writer.py.
 
+import os
 import pandas as pd
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
 from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.utils import get_column_letter
 from database import Database
 import json
 
-# Load constants from JSON file
-with open('constants.json') as f:
-    constants = json.load(f)
+# Number of rows read from the database and written to the sheet at a time
+CHUNK_SIZE = 50_000
 
-DB_PATH = constants['gldbFilePath']
-YEAR = '2024'
-EXCEL_PATH = constants['excelWriter']['excelPath']
-SHEET_NAME = constants['excelWriter']['sheetName']
-TABLE_NAME = constants['excelWriter']['tableName']
-
-def write_data_to_excel(db_path, year, excel_path, sheet_name, table_name):
+def write_data_to_excel(db_path, year, excel_path, sheet_name, table_name, query=None, write_only=False,
+                        write_only_excel_path=None):
+    # query: optional SQL with one parameter for the year, e.g. to let SQLite aggregate the GL items:
+    #   SELECT account_id, posting_period, SUM(transaction_amount) AS total_cents, COUNT(*) AS item_count
+    #   FROM gl_items WHERE posting_year = ? GROUP BY account_id, posting_period
+    # By default all GL items of the year are written.
+    # write_only: stream the rows into a new workbook instead, with openpyxl's write-only mode. This keeps
+    # the memory use flat for large years, but the new workbook only has this sheet and no table. It is saved
+    # to write_only_excel_path (default: <excel_path>_gl_items.xlsx), never over the workbook at excel_path.
+    if write_only:
+        if write_only_excel_path is None:
+            write_only_excel_path = f"{os.path.splitext(excel_path)[0]}_gl_items.xlsx"
+        if os.path.abspath(write_only_excel_path) == os.path.abspath(excel_path):
+            raise ValueError(f"write_only_excel_path must not be the workbook {excel_path}, it would lose its other sheets.")
+        book = Workbook(write_only=True)
+        sheet = book.create_sheet(sheet_name)
+    else:
+        # Load the existing workbook once and clear the sheet in place, so that its settings are kept;
+        # the old table and cells are removed
+        book = load_workbook(excel_path)
+        if sheet_name in book.sheetnames:
+            sheet = book[sheet_name]
+            if table_name in sheet.tables:
+                del sheet.tables[table_name]
+            sheet.delete_rows(1, sheet.max_row)
+        else:
+            sheet = book.create_sheet(sheet_name)
+    
     # Initialize the database
     db = Database(db_path)
     
-    # Query the data for the specified year
-    query = f"SELECT * FROM gl_items WHERE posting_year = ?"
-    df = pd.read_sql_query(query, db.connection, params=(year,))
+    # Query the data for the specified year and write it to the sheet in chunks, so that the whole year
+    # is never held in a DataFrame. The column widths are tracked per chunk.
+    if query is None:
+        query = "SELECT * FROM gl_items WHERE posting_year = ?"
+    columns = None
+    max_lens = None
+    max_row = 0
+    for df in pd.read_sql_query(query, db.connection, params=(int(year),), chunksize=CHUNK_SIZE):
+        if 'transaction_amount' in df:
+            df['transaction_amount'] = df['transaction_amount'] / 100
+        if columns is None:
+            columns = list(df.columns)
+            sheet.append(columns)
+            max_lens = [len(col) for col in columns]
+        
+        # Write the chunk to the sheet, missing values become empty cells
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+        
+        for i, col in enumerate(columns):
+            max_length = df[col].astype('string').str.len().max()
+            if not pd.isna(max_length):
+                max_lens[i] = max(max_lens[i], int(max_length))
+        max_row += len(df)
     
     # Close the database connection
     db.close()
     
-    # Load the existing workbook
-    book = load_workbook(excel_path)
-    
-    # Write the dataframe data to the specified sheet
-    with pd.ExcelWriter(excel_path, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-    
-    # Reload the workbook to add the table
-    book = load_workbook(excel_path)
-    sheet = book[sheet_name]
-    
-    # Remove the existing table if it exists
-    existing_tables = [tbl for tbl in sheet.tables.values() if tbl.displayName == table_name]
-    for tbl in existing_tables:
-        del sheet.tables[tbl.displayName]
+    if write_only:
+        book.save(write_only_excel_path)
+        return
     
     # Define the table range
-    (max_row, max_col) = df.shape
-    table_range = f"A1:{chr(65 + max_col - 1)}{max_row + 1}"
+    max_col = len(columns)
+    table_range = f"A1:{get_column_letter(max_col)}{max_row + 1}"
     
     # Create a table
     table = Table(displayName=table_name, ref=table_range)
@@ -61,11 +92,22 @@ def write_data_to_excel(db_path, year, excel_path, sheet_name, table_name):
     sheet.add_table(table)
     
     # Set the column width for better visibility
-    for i, col in enumerate(df.columns):
-        max_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
-        sheet.column_dimensions[chr(65 + i)].width = max_len
+    for i, max_len in enumerate(max_lens):
+        sheet.column_dimensions[get_column_letter(i + 1)].width = max_len + 2
     
     # Save the workbook
     book.save(excel_path)
 
-write_data_to_excel(DB_PATH, YEAR, EXCEL_PATH, SHEET_NAME, TABLE_NAME)
\ No newline at end of file
+# Only run when executed as a script, so importing write_data_to_excel has no side effects
+if __name__ == "__main__":
+    # Load constants from JSON file
+    with open('constants.json') as f:
+        constants = json.load(f)
+
+    DB_PATH = constants['gldbFilePath']
+    YEAR = '2024'
+    EXCEL_PATH = constants['excelWriter']['excelPath']
+    SHEET_NAME = constants['excelWriter']['sheetName']
+    TABLE_NAME = constants['excelWriter']['tableName']
+
+    write_data_to_excel(DB_PATH, YEAR, EXCEL_PATH, SHEET_NAME, TABLE_NAME)
@@ -1,4 +1,27 @@
+import functools
 import json
+import re
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick  # Optional: pyahocorasick speeds up the GL mapping lookup
+except ImportError:
+    ahocorasick = None
+
+DATE_FORMAT_MAPPINGS = {
+    "YYYY": "%Y",
+    "YY": "%y",
+    "MM": "%m",
+    "DD": "%d"
+}
+# Longer tokens come first in the alternation, so "YYYY" is never matched as two "YY"
+DATE_FORMAT_TOKEN_PATTERN = re.compile("|".join(DATE_FORMAT_MAPPINGS))
+
+@functools.lru_cache(maxsize=None)
+def _derive_date_format(date_format_string: str) -> str:
+    # Translates a bank account dateFormat (e.g. "DD.MM.YYYY") to a strptime format, once per distinct format
+    return DATE_FORMAT_TOKEN_PATTERN.sub(lambda match: DATE_FORMAT_MAPPINGS[match.group()], date_format_string)
 
 #class BankAccounts that reads all bank account properties from a JSON file
 class BankAccounts:
@@ -22,23 +45,107 @@ class BankAccount:
     def __init__(self, bank_accounts: BankAccounts, bank_account_code: str):
         self.bank_account_code = bank_account_code
         self.properties = bank_accounts.get_bank_account(bank_account_code)
+        # Resolve the properties used for every bank file and transaction once
+        self.csv_read_options = self._build_csv_read_options()
+        self.bank_account_type = self.properties["bankAccountType"]
+        self.currency_unit = self.properties["currencyUnit"]
+        self.balance_sheet_account = self.properties["balanceSheetAccount"]
+        # Descriptions of bank records to exclude, compiled once for all bank files of the account.
+        # The filter strings are matched literally, e.g. "(SWEEP)" or "A+B" are not read as regular expressions.
+        filter_strings = self.properties.get("bankRecordFilterStrings", [])
+        self.bank_record_filter = re.compile('|'.join(map(re.escape, filter_strings))) if filter_strings else None
+        self._gl_mapping_automaton = self._build_gl_mapping_automaton()
+
+    def _build_csv_read_options(self) -> dict:
+        """
+        Builds the pd.read_csv keyword arguments for the bank files of the account. Files with and without
+        a header row are read with the same call, only the header option differs.
+        """
+        return dict(
+            sep=self.properties["csvFileSeparator"],
+            usecols=self.properties["csvFileColumns"],
+            names=self.properties["csvFileColumnTitles"],
+            header=0 if self.properties["csvFileHasHeader"] else None,
+            index_col=None,
+            parse_dates=["Date"],
+            # An explicit format lets pandas parse the dates in C instead of guessing the format per value
+            date_format=_derive_date_format(self.properties["dateFormat"]),
+            dtype={"Amount": str, "Description": str, "CheckNo": str},  # Skip dtype inference for text columns
+            engine="c",
+            # Infer the types of the remaining columns in one pass over the whole file instead of per chunk
+            low_memory=False
+        )
+
+    def _build_gl_mapping_automaton(self):
+        """
+        Builds an Aho-Corasick automaton over the search strings of all GL mappings, so that a search string
+        is scanned once for all mappings instead of once per mapping.
+        Returns None if pyahocorasick is not installed or a mapping has an empty search string;
+        vectorized_gl_mapping then falls back to checking the mappings one by one.
+        """
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for priority, gl_mapping in enumerate(self.properties["glMapping"]):
+            if not gl_mapping["searchString"]:
+                return None
+            # Keep the first mapping of a duplicated search string, so the mapping listed first wins
+            if gl_mapping["searchString"] not in automaton:
+                automaton.add_word(gl_mapping["searchString"], priority)
+        if len(automaton) == 0:
+            return None
+        automaton.make_automaton()
+        return automaton
+
+    def vectorized_gl_mapping(self, descriptions: pd.Series, bank_transaction_categories: np.ndarray) -> pd.DataFrame:
+        """
+        Determines the GL mapping of many bank transactions at once.
 
-    def get_gl_mapping_for_search_string(self, search_string: str, bank_transaction_category: str) -> dict:
-        for gl_mapping in self.properties["glMapping"]:
-            # print(f"Checking GL mapping: {gl_mapping['searchString']} against search string: {search_string}")
-            if gl_mapping["searchString"] in search_string:
-                return gl_mapping
-        
-        # If no mapping found, return the default mapping
-        if bank_transaction_category == "D":
-            return {
-                "searchString": search_string,
-                "glAccount": self.properties["missingGlMappingDefault"]["glAccountRevenue"],
-                "bp": self.properties["missingGlMappingDefault"]["unknownBp"]
-            }
+        A GL mapping applies if its searchString is contained in the description; if several mappings apply,
+        the one listed first in glMapping wins. Without a matching mapping, the missingGlMappingDefault is used:
+        glAccountRevenue for deposits (category "D"), glAccountExpense otherwise, and unknownBp.
+
+        With the Aho-Corasick automaton each distinct description is scanned once. Without it, each GL mapping
+        is checked against all descriptions with a vectorized substring search, and np.select picks the
+        first matching mapping per description.
+
+        Args:
+            descriptions (pd.Series): The descriptions of the bank transactions.
+            bank_transaction_categories (np.ndarray): The bank transaction category of each transaction.
+
+        Returns:
+            pd.DataFrame: The columns glAccount and bp, with the index of descriptions.
+        """
+        gl_mappings = self.properties["glMapping"]
+        if self._gl_mapping_automaton is not None:
+            mapping_index_by_description = {}
+            for description in descriptions.unique():
+                priorities = [priority for _, priority in self._gl_mapping_automaton.iter(description)]
+                mapping_index_by_description[description] = min(priorities) if priorities else -1
+            mapping_index = descriptions.map(mapping_index_by_description).to_numpy(dtype=np.int64)
+        elif gl_mappings:
+            masks = [
+                descriptions.str.contains(gl_mapping["searchString"], regex=False, na=False).to_numpy()
+                for gl_mapping in gl_mappings
+            ]
+            mapping_index = np.select(masks, list(range(len(gl_mappings))), default=-1)
         else:
-            return {
-                "searchString": search_string,
-                "glAccount": self.properties["missingGlMappingDefault"]["glAccountExpense"],
-                "bp": self.properties["missingGlMappingDefault"]["unknownBp"]
-            }
+            mapping_index = np.full(len(descriptions), -1)
+
+        # Index -1 (no mapping found) selects the trailing placeholder, which is replaced by the default mapping
+        mapped_gl_accounts = np.array([gl_mapping["glAccount"] for gl_mapping in gl_mappings] + [None], dtype=object)
+        mapped_bps = np.array([gl_mapping["bp"] for gl_mapping in gl_mappings] + [None], dtype=object)
+        missing_gl_mapping_default = self.properties["missingGlMappingDefault"]
+        default_gl_accounts = np.where(
+            np.asarray(bank_transaction_categories) == "D",
+            missing_gl_mapping_default["glAccountRevenue"],
+            missing_gl_mapping_default["glAccountExpense"]
+        ).astype(object)
+
+        return pd.DataFrame(
+            {
+                "glAccount": np.where(mapping_index >= 0, mapped_gl_accounts[mapping_index], default_gl_accounts),
+                "bp": np.where(mapping_index >= 0, mapped_bps[mapping_index], missing_gl_mapping_default["unknownBp"]),
+            },
+            index=descriptions.index
+        )
@@ -1,26 +1,49 @@
+import logging
 import os
+import numpy as np
 import pandas as pd
 import hashlib
 from bank_account import BankAccount
 from decimal import Decimal
 
-class BankFilesIterator:
-    def __init__(self, folder_path: str):
-        self.folder_path = folder_path
-        self.files = [f for f in os.listdir(folder_path) if f.endswith('.csv')]
-        self.index = 0
-
-    def __iter__(self):
-        return self
-
-    def __next__(self):
-        if self.index < len(self.files):
-            file_name = self.files[self.index]
-            self.index += 1
-            bank_account_code = file_name.split('-')[0]
-            return bank_account_code, os.path.join(self.folder_path, file_name)
-        else:
-            raise StopIteration
+logger = logging.getLogger(__name__)
+
+# Amounts with at most 13 integer digits and two decimal places, e.g. "-1234.5". Their cents stay below 2**53,
+# so they convert to cents exactly through floats; longer amounts are converted through Decimal.
+SIMPLE_AMOUNT_PATTERN = r'[+-]?(?:\d{1,13}(?:\.\d{0,2})?|\.\d{1,2})'
+
+def _amounts_to_cents(amounts: pd.Series) -> np.ndarray:
+    """
+    Converts amount texts with a decimal point to integer cents, rounded half to even like round(Decimal(x), 2).
+    Only amounts with more than 13 integer digits, more decimal places or other notations (e.g. exponents)
+    are converted through Decimal.
+    """
+    cents = np.zeros(len(amounts), dtype=np.int64)
+    simple = amounts.str.fullmatch(SIMPLE_AMOUNT_PATTERN).fillna(False).to_numpy(dtype=bool)
+    cents[simple] = np.rint(amounts[simple].astype(np.float64).to_numpy() * 100)
+    cents[~simple] = [int(round(Decimal(amount), 2) * 100) for amount in amounts[~simple]]
+    return cents
+
+def _format_cents(cents: np.ndarray) -> pd.Series:
+    # Format cents with two decimal places, like str() of a Decimal rounded to 2 places
+    absolute_cents = pd.Series(np.abs(cents))
+    return (
+        pd.Series(np.where(cents < 0, '-', ''))
+        + (absolute_cents // 100).astype(str)
+        + '.'
+        + (absolute_cents % 100).astype(str).str.zfill(2)
+    )
+
+def iter_bank_files(folder_path: str):
+    """
+    Yields the bank account code and path of each bank transaction CSV file in the folder.
+    The file names start with the bank account code, followed by a dash, e.g. "CHK-2024.csv".
+    """
+    # scandir yields the entries with their paths while reading the directory, no file list is built upfront
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.csv'):
+                yield entry.name.split('-', 1)[0], entry.path
 
 class BankFileTransactions:
     bank_account_code: str
@@ -37,47 +60,25 @@ class BankFileTransactions:
         self._filter_bank_records()
         self._set_transaction_id()
 
-    def _derive_date_format(self, date_format_string: str) -> str:
-        format_mappings = {
-            "YYYY": "%Y",
-            "YY": "%y",
-            "MM": "%m",
-            "DD": "%d"
-        }
-        for key, value in format_mappings.items():
-            date_format_string = date_format_string.replace(key, value)
-        return date_format_string
-
     def _read_bank_transactions_csv_file(self) -> pd.DataFrame:
-        print(f"csvFileHasHeader: {self.bank_account.properties['csvFileHasHeader']}")
-        print(f"csvFileColumnTitles: {self.bank_account.properties['csvFileColumnTitles']}")
-        print(f"csvFileColumns: {self.bank_account.properties['csvFileColumns']}")
-
-        bank_transactions: pd.DataFrame
-
-        if self.bank_account.properties["csvFileHasHeader"]:
-            bank_transactions = pd.read_csv(
-                self.csv_file_path,
-                sep=self.bank_account.properties["csvFileSeparator"],
-                usecols=self.bank_account.properties["csvFileColumns"],
-                names=self.bank_account.properties["csvFileColumnTitles"],
-                header=0,
-                index_col=None,
-                parse_dates=["Date"],
-                date_format=self._derive_date_format(self.bank_account.properties["dateFormat"]),
-                dtype={"CheckNo": str}  # Ensure CheckNo is read as a string
+        # The read_csv options are derived from the bank account properties once per bank account
+        bank_transactions: pd.DataFrame = pd.read_csv(self.csv_file_path, **self.bank_account.csv_read_options)
+
+        # read_csv leaves the dates as text if any of them does not match the date format. Fail instead of
+        # letting pandas guess the format later, which would silently swap day and month.
+        if bank_transactions.empty:
+            bank_transactions['Date'] = bank_transactions['Date'].astype('datetime64[ns]')
+        elif not pd.api.types.is_datetime64_any_dtype(bank_transactions['Date']):
+            raise ValueError(
+                f"The dates in {self.csv_file_path} do not match the dateFormat "
+                f"'{self.bank_account.properties['dateFormat']}' of bank account {self.bank_account_code}."
             )
-        else:
-            bank_transactions = pd.read_csv(
-                self.csv_file_path,
-                sep=self.bank_account.properties["csvFileSeparator"],
-                usecols=self.bank_account.properties["csvFileColumns"],
-                names=self.bank_account.properties["csvFileColumnTitles"],
-                header=None,
-                index_col=None,
-                parse_dates=["Date"],
-                date_format=self._derive_date_format(self.bank_account.properties["dateFormat"]),
-                dtype={"CheckNo": str}  # Ensure CheckNo is read as a string
+        # Every transaction needs a date for its transaction ID and posting period; empty dates are read as NaT
+        missing_dates = bank_transactions['Date'].isna()
+        if missing_dates.any():
+            raise ValueError(
+                f"Bank transactions without a date in {self.csv_file_path}, "
+                f"rows {(bank_transactions.index[missing_dates] + 1).tolist()}."
             )
 
         # Return the DataFrame
@@ -87,24 +88,33 @@ class BankFileTransactions:
 
         # 1) Standardize the Amount column to use a decimal point
         # This is necessary for German banks that use a comma as a decimal separator
-        self.bank_transactions['Amount'] = self.bank_transactions['Amount'].apply(lambda x: str(x).replace(',', '.'))
+        self.bank_transactions['Amount'] = self.bank_transactions['Amount'].astype(str).str.replace(',', '.', regex=False)
         
-        # 2) Convert the Amount column to Decimal type and round to 2 decimal places
-        self.bank_transactions['Amount'] = self.bank_transactions['Amount'].apply(lambda x: round(Decimal(x), 2))
+        # 2) Convert the Amount column to integer cents, rounded to 2 decimal places,
+        # and keep the amount in currency units as a float for display
+        self.bank_transactions['AmountCents'] = _amounts_to_cents(self.bank_transactions['Amount'])
+        self.bank_transactions['Amount'] = self.bank_transactions['AmountCents'] / 100
         
         # 3) Replace empty, NaN, or space-only values in the "Description" column with "<No Description>"
-        self.bank_transactions['Description'] = self.bank_transactions['Description'].apply(
-            lambda x: '<No Description>' if pd.isna(x) or str(x).strip() == '' else x
+        missing_description = (
+            self.bank_transactions['Description'].isna()
+            | (self.bank_transactions['Description'].astype(str).str.strip() == '')
         )
+        self.bank_transactions.loc[missing_description, 'Description'] = '<No Description>'
 
         # 4) Add a column for the bank CSV file name
-        self.bank_transactions['CSVFile'] = os.path.basename(self.csv_file_path)
+        # The name is the same for all rows, so it is stored as a categorical with a single category
+        # and one small integer code per row instead of an object array
+        self.bank_transactions['CSVFile'] = pd.Categorical.from_codes(
+            np.zeros(len(self.bank_transactions), dtype=np.int8), categories=[os.path.basename(self.csv_file_path)]
+        )
 
         # 5) Add a column for the row index
         self.bank_transactions['RowIndex'] = self.bank_transactions.index + 1  # Adding 1 to make it 1-based index
 
-        # print the first 5 rows of the DataFrame for debugging
-        print(self.bank_transactions.head())
+        # Log the first 5 rows of the DataFrame for debugging; the DataFrame is only formatted when debug logging is enabled
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{self.csv_file_path}:\n{self.bank_transactions.head()}")
 
     def _set_transaction_id(self):
         """
@@ -113,16 +123,29 @@ class BankFileTransactions:
         - Amount
         - Description
         - Bank account code
-        The transaction ID is generated using SHA-256 hashing algorithm to ensure uniqueness.
+        The transaction ID is a 128-bit BLAKE2b hash (32 hex characters) of these values. It is a content
+        fingerprint, not a security feature, so the faster BLAKE2b is used instead of SHA-256.
         """
 
-        # Set the transaction ID for each row in the DataFrame using SHA-256 hashing
-        self.bank_transactions['TransactionID'] = self.bank_transactions.apply(
-            lambda row: hashlib.sha256(
-                f"{row['Date']}{row['Amount']}{row['Description']}{self.bank_account_code}".encode()
-            ).hexdigest(),
-            axis=1
-        )
+        # Encode the hash input columns to bytes with vectorized string operations, then feed them to the hash
+        # one after the other, without building a concatenated string per row. The date is formatted like
+        # str(Timestamp).
+        date_bytes = self.bank_transactions['Date'].dt.strftime('%Y-%m-%d %H:%M:%S').str.encode('ascii')
+        amount_bytes = _format_cents(self.bank_transactions['AmountCents'].to_numpy()).str.encode('ascii')
+        description_bytes = self.bank_transactions['Description'].astype(str).str.encode('utf-8')
+        bank_account_code_bytes = self.bank_account_code.encode('utf-8')
+
+        # Set the transaction ID for each row in the DataFrame using BLAKE2b hashing
+        transaction_ids = []
+        for date_input, amount_input, description_input in zip(
+            date_bytes.tolist(), amount_bytes.tolist(), description_bytes.tolist()
+        ):
+            transaction_hash = hashlib.blake2b(date_input, digest_size=16)
+            transaction_hash.update(amount_input)
+            transaction_hash.update(description_input)
+            transaction_hash.update(bank_account_code_bytes)
+            transaction_ids.append(transaction_hash.hexdigest())
+        self.bank_transactions['TransactionID'] = pd.Series(transaction_ids, index=self.bank_transactions.index, dtype=object)
 
         # Add a column "sub_no" to handle duplicate TransactionIDs
         self.bank_transactions['sub_no'] = self.bank_transactions.groupby('TransactionID').cumcount() + 1
@@ -132,9 +155,8 @@ class BankFileTransactions:
         # to the original TransactionID
         # The format will be: <original TransactionID>_<sub_no>
         # This covers the case where there are two transactions with the same date, amount, description, and bank account code
-        self.bank_transactions['TransactionID'] = self.bank_transactions.apply(
-            lambda row: f"{row['TransactionID']}_{row['sub_no']}",
-            axis=1
+        self.bank_transactions['TransactionID'] = (
+            self.bank_transactions['TransactionID'] + '_' + self.bank_transactions['sub_no'].astype(str)
         )
 
     def _filter_bank_records(self):
@@ -144,7 +166,7 @@ class BankFileTransactions:
         The filter strings are defined in the bank account properties under the key "bankRecordFilterStrings".
         This is needed for Vanguard accounts to exclude transactions that are not relevant for the GL, e.g. sweep transactions.
         """
-        filter_strings = self.bank_account.properties.get("bankRecordFilterStrings", [])
-        if filter_strings:
-            pattern = '|'.join(filter_strings)
-            self.bank_transactions = self.bank_transactions[~self.bank_transactions['Description'].str.contains(pattern, na=False)]
+        if self.bank_account.bank_record_filter is not None:
+            self.bank_transactions = self.bank_transactions[
+                ~self.bank_transactions['Description'].str.contains(self.bank_account.bank_record_filter, na=False)
+            ]
@@ -1,76 +1,186 @@
+import functools
 import sqlite3
-from decimal import Decimal  # To represent monetary values, https://docs.python.org/3/library/decimal.html
+from contextlib import contextmanager
 from datetime import datetime
+from typing import Iterable
 
-# Adapter functions to map decimals to integers for storage in SQLite
-def adapt_decimal(d):
-    return int(d * 100)
+# Transaction amounts are stored as integer cents. They are inserted and read as plain integers;
+# readers that present amounts divide them by 100.
 
-def convert_decimal(i):
-    return Decimal(i.decode('utf-8')) / 100
+# Dates are stored as ISO text "YYYY-MM-DD", which the GL item rows already contain.
+# The converter maps them back to datetime when reading.
+def convert_date(date_str):
+    return datetime.fromisoformat(date_str.decode('utf-8'))
 
-# Adapter functions to map datetime to string for storage in SQLite
-def adapt_date(date):
-    return date.strftime("%Y-%m-%d")
+# Columns of the GL items table with their declared types, in table order
+GL_ITEMS_COLUMNS = [
+    ("transaction_id", "TEXT"),
+    ("transaction_item_id", "TEXT"),
+    ("bank_csv_file", "TEXT"),
+    ("bank_csv_row_no", "INTEGER"),
+    ("transaction_date", "DATE"),
+    ("posting_year", "INTEGER"),
+    ("posting_period", "INTEGER"),
+    ("transaction_amount", "INTEGER"),  # In cents
+    ("currency_unit", "TEXT"),
+    ("debit_credit_indicator", "TEXT"),
+    ("transaction_description", "TEXT"),
+    ("account_id", "TEXT"),
+    ("business_partner", "TEXT"),
+    ("bank_account_code", "TEXT"),
+    ("investment_name", "TEXT"),
+    ("investment_symbol", "TEXT"),
+    ("check_no", "TEXT"),
+    ("account_type", "TEXT"),
+    ("is_taxable", "BOOLEAN"),
+]
 
-def convert_date(date_str):
-    return datetime.strptime(date_str.decode('utf-8'), "%Y-%m-%d")
+@functools.lru_cache(maxsize=None)
+def _gl_items_insert_sql(table_name: str) -> str:
+    # Build the INSERT statement once per table, so the same string is reused for every batch
+    return (
+        f"INSERT OR IGNORE INTO {table_name} ({', '.join(name for name, _ in GL_ITEMS_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in GL_ITEMS_COLUMNS)})"
+    )
 
 class Database:
     db_path: str
     connection: sqlite3.Connection
     cursor: sqlite3.Cursor
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, journal_mode: str = "WAL", synchronous: str = "NORMAL",
+                 temp_store: str = "MEMORY", cache_size: int = -65536, mmap_size: int = 268435456):
+        """
+        Opens the SQLite database and tunes the connection for bulk loads.
+
+        The defaults use a write-ahead log with fewer fsyncs (still crash-safe in WAL mode), keep temporary
+        tables in memory, use a 64 MiB page cache (negative cache_size is in KiB) and memory-map up to
+        256 MiB of the database file. Pass other values, e.g. journal_mode="DELETE", to override them.
+        """
         if not db_path:
             raise ValueError("db_path must be a valid string representing the path to the database file.")
         self.db_path = db_path
-        self.connection = sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+        # Size the statement cache explicitly, so the compiled statements of repeated queries are kept.
+        # isolation_level=None turns off the implicit BEGIN before DML: transactions are only opened
+        # explicitly by transaction(), so a whole load runs in one transaction.
+        self.connection = sqlite3.connect(
+            self.db_path, detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None, cached_statements=128
+        )
         self.cursor = self.connection.cursor()
-        
-        # Register the adapter and converter for transaction amount
-        sqlite3.register_adapter(Decimal, adapt_decimal)
-        sqlite3.register_converter("DECIMAL", convert_decimal)
+        # Dedicated long-lived cursor for the GL item bulk inserts
+        self._insert_cursor = self.connection.cursor()
 
-        # Register the adapter and converter for transaction date
-        sqlite3.register_adapter(datetime, adapt_date)
+        self.cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.cursor.execute(f"PRAGMA synchronous={synchronous}")
+        self.cursor.execute(f"PRAGMA temp_store={temp_store}")
+        self.cursor.execute(f"PRAGMA cache_size={int(cache_size)}")
+        self.cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        
+        # Register the converter for transaction date
         sqlite3.register_converter("DATE", convert_date)
     
-    def commit(self):
-        self.connection.commit()
+    @contextmanager
+    def transaction(self):
+        """
+        Runs the statements of the with-block in a single transaction.
+
+        The transaction is started with BEGIN IMMEDIATE, so the write lock is taken upfront, committed
+        when the block ends, and rolled back if the block raises an exception. The connection is in
+        autocommit mode, so statements outside of transaction() are committed one by one.
+        """
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.cursor.execute("ROLLBACK")
+            raise
+        self.cursor.execute("COMMIT")
+    
+    @contextmanager
+    def bulk_mode(self):
+        """
+        Turns off syncing to disk (PRAGMA synchronous=OFF) for the statements of the with-block, e.g. a bulk load
+        that can simply be repeated. An operating system crash or power loss during the block can corrupt the
+        database. The previous setting is restored when the block ends.
+        """
+        synchronous = self.cursor.execute("PRAGMA synchronous").fetchone()[0]
+        self.cursor.execute("PRAGMA synchronous=OFF")
+        try:
+            yield
+        finally:
+            self.cursor.execute(f"PRAGMA synchronous={int(synchronous)}")
     
     def close(self):
         self.connection.close()
 
     def drop_table(self, table_name: str):
-        self.cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-        self.connection.commit()
+        with self.transaction():
+            self.cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
 
     def create_gl_table(self, table_name: str):
+        with self.transaction():
+            self._execute_create_gl_table(table_name)
+
+    def _execute_create_gl_table(self, table_name: str):
+        column_definitions = ",\n                ".join(f"{name} {column_type}" for name, column_type in GL_ITEMS_COLUMNS)
         self.cursor.execute(
             f"""
             CREATE TABLE IF NOT EXISTS {table_name} (
-                transaction_id TEXT,
-                transaction_item_id TEXT,
-                bank_csv_file TEXT,
-                bank_csv_row_no INTEGER,
-                transaction_date DATE,
-                posting_year INTEGER,
-                posting_period INTEGER,
-                transaction_amount DECIMAL, 
-                currency_unit TEXT,
-                debit_credit_indicator TEXT,
-                transaction_description TEXT,
-                account_id TEXT,
-                business_partner TEXT,
-                bank_account_code TEXT,
-                investment_name TEXT,
-                investment_symbol TEXT,
-                check_no TEXT,
-                account_type TEXT,
-                is_taxable BOOLEAN,
+                {column_definitions},
                 PRIMARY KEY (transaction_id, transaction_item_id)
             )
             """
         )
-        self.connection.commit()
+        self._execute_create_gl_indexes(table_name)
+
+    def _execute_create_gl_indexes(self, table_name: str):
+        # Index for the reports by posting year
+        self.cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table_name}_posting_year ON {table_name} (posting_year)"
+        )
+
+    def reset_gl_table(self, table_name: str):
+        """
+        Empties the GL items table, or creates it if it does not exist yet.
+
+        If the table already has the current columns, its rows are deleted. This keeps the schema
+        (and the schema version) unchanged, and SQLite reuses the freed pages for the following inserts.
+        Otherwise the table is dropped and recreated. Either way the posting year index is ensured and it
+        happens in a single transaction.
+
+        Args:
+            table_name (str): The name of the GL items table.
+        """
+        existing_columns = [
+            (column[1], column[2]) for column in self.cursor.execute(f"PRAGMA table_info({table_name})")
+        ]
+        with self.transaction():
+            if existing_columns == GL_ITEMS_COLUMNS:
+                self.cursor.execute(f"DELETE FROM {table_name}")
+                # Tables created by earlier versions also have an index per bank account and year, which no
+                # query uses but every load has to maintain
+                self.cursor.execute(f"DROP INDEX IF EXISTS idx_{table_name}_bank_account_year")
+                self._execute_create_gl_indexes(table_name)
+            else:
+                self.cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                self._execute_create_gl_table(table_name)
+
+    def insert_gl_items_bulk(self, table_name: str, rows: Iterable[tuple]) -> int:
+        """
+        Inserts GL item rows into the GL items table.
+
+        All rows are sent with one executemany() call, so the INSERT statement is compiled once.
+        The rows are not committed: run the inserts of a whole load inside transaction(), so that
+        they are committed (and synced to disk) only once. Rows whose primary key
+        (transaction_id, transaction_item_id) is already in the table are skipped by SQLite.
+
+        Args:
+            table_name (str): The name of the GL items table.
+            rows (Iterable[tuple]): Tuples in the column order of the GL items table; any iterable,
+                including a generator, is consumed directly by executemany().
+
+        Returns:
+            int: The number of rows inserted.
+        """
+        self._insert_cursor.executemany(_gl_items_insert_sql(table_name), rows)
+        return self._insert_cursor.rowcount
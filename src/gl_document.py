@@ -1,189 +1,131 @@
-import hashlib
-from decimal import Decimal
-from gl_item import GLItem
+import logging
+import numpy as np
+import pandas as pd
 from bank_account import BankAccount
-from database import Database
 from chart_of_accounts import ChartOfAccounts
 from constants import Constants
 
-class GLDocument:
-    def __init__(self, bank_transaction_record, bank_account: BankAccount, chart_of_accounts: ChartOfAccounts, constants: Constants):
-        self.bank_transaction_record = bank_transaction_record
-        self.bank_account = bank_account
-        self.chart_of_accounts = chart_of_accounts
-        self.constants = constants  # Store the constants
-        self.items = []
-        self.bank_transaction_category = self._determine_bank_transaction_category()
-        self._add_gl_item()
-        self._add_offsetting_gl_item()
-
-    def _determine_bank_transaction_category(self) -> str:
-        if self.bank_account.properties["bankAccountType"] == self.constants.get('bankAccountTypes')['debit']:
-            if self.bank_transaction_record.Amount >= 0:
-                return self.constants.get('bankTransactionCategories')['deposit']
-            else:
-                return self.constants.get('bankTransactionCategories')['withdrawal']
-        else:
-            if self.bank_transaction_record.Amount >= 0:
-                return self.constants.get('bankTransactionCategories')['withdrawal']
-            else:
-                return self.constants.get('bankTransactionCategories')['deposit']
-        
-
-    def _add_gl_item(self):
-        gl_mapping = self.bank_account.get_gl_mapping_for_search_string(
-            self.bank_transaction_record.Description, 
-            self.bank_transaction_category
-        )
-        # Determine the debit/credit indicator based on the bank transaction category for the P&L account
-        # - For deposits, the bank account (balance sheet) is debited and the P&L account is credited.
-        # - For withdrawals, the bank account (balance sheet) is credited and the P&L account is debited.
-        if self.bank_transaction_category == self.constants.get('bankTransactionCategories')['deposit']:
-            debit_credit_indicator = self.constants.get('dcIndicators')['credit']
-        else:
-            debit_credit_indicator = self.constants.get('dcIndicators')['debit']
-
-        investment_name = getattr(self.bank_transaction_record, 'Investment', None)
-        investment_symbol = getattr(self.bank_transaction_record, 'Symbol', None)
-        check_no = getattr(self.bank_transaction_record, 'CheckNo', None)
-
-        account_properties = self.chart_of_accounts.get_account_properties(gl_mapping["glAccount"])
+logger = logging.getLogger(__name__)
+
+def build_gl_item_rows(bank_transactions: pd.DataFrame, bank_account: BankAccount,
+                       chart_of_accounts: ChartOfAccounts, constants: Constants) -> tuple:
+    """
+    Creates the GL documents of all transactions of a bank file.
+
+    Each bank transaction becomes a GL document with two GL items: item "001" posts the amount to the
+    P&L account of the transaction's GL mapping, item "002" offsets it on the balance sheet account of
+    the bank account. The categories, debit/credit indicators and amounts are computed column-wise for
+    the whole DataFrame, only the final rows are assembled per transaction.
+
+    Args:
+        bank_transactions (pd.DataFrame): The bank transactions, as prepared by BankFileTransactions.
+        bank_account (BankAccount): The bank account of the transactions.
+        chart_of_accounts (ChartOfAccounts): The chart of accounts.
+        constants (Constants): The configuration constants.
+
+    Returns:
+        tuple: The GL item rows in the column order of the `gl_items` table (the two items of a
+        transaction follow each other), and the number of transactions for which no GL document
+        could be created.
+    """
+    if bank_transactions.empty:
+        return [], 0
+
+    deposit = constants.get('bankTransactionCategories')['deposit']
+    withdrawal = constants.get('bankTransactionCategories')['withdrawal']
+    debit = constants.get('dcIndicators')['debit']
+    credit = constants.get('dcIndicators')['credit']
+
+    # GL item amounts are integer cents
+    amount_cents = bank_transactions['AmountCents'].to_numpy(dtype=np.int64)
+
+    # Deposits increase the balance of a debit (e.g. checking) account and decrease that of a credit (card) account
+    if bank_account.bank_account_type == constants.get('bankAccountTypes')['debit']:
+        is_deposit = amount_cents >= 0
+    else:
+        is_deposit = amount_cents < 0
+    categories = np.where(is_deposit, deposit, withdrawal)
+
+    # Determine the debit/credit indicator based on the bank transaction category for the P&L account
+    # - For deposits, the bank account (balance sheet) is debited and the P&L account is credited.
+    # - For withdrawals, the bank account (balance sheet) is credited and the P&L account is debited.
+    debit_credit_indicators = np.where(is_deposit, credit, debit).tolist()
+    offsetting_debit_credit_indicators = np.where(is_deposit, debit, credit).tolist()
+    transaction_amounts = np.where(is_deposit, -np.abs(amount_cents), np.abs(amount_cents)).tolist()
+
+    gl_mappings = bank_account.vectorized_gl_mapping(bank_transactions['Description'], categories)
+    gl_accounts = gl_mappings['glAccount'].tolist()
+    bps = gl_mappings['bp'].tolist()
+    # Look up the properties of each distinct GL account once
+    account_properties_by_id = {
+        account_id: chart_of_accounts.get_account_properties(account_id) for account_id in set(gl_accounts)
+    }
+
+    offsetting_account_id = bank_account.balance_sheet_account
+    offsetting_account_properties = chart_of_accounts.get_account_properties(offsetting_account_id)
+
+    # The Date column is parsed by BankFileTransactions; the dates are stored as ISO text,
+    # formatted for the whole file at once
+    dates = bank_transactions['Date'].dt
+    transaction_dates = dates.strftime('%Y-%m-%d').tolist()
+    posting_years = dates.year.tolist()
+    posting_periods = dates.month.tolist()
+
+    no_values = [None] * len(bank_transactions)
+    investment_names = bank_transactions['Investment'].tolist() if 'Investment' in bank_transactions else no_values
+    investment_symbols = bank_transactions['Symbol'].tolist() if 'Symbol' in bank_transactions else no_values
+    check_nos = bank_transactions['CheckNo'].tolist() if 'CheckNo' in bank_transactions else no_values
+
+    currency_unit = bank_account.currency_unit
+    bank_account_code = bank_account.properties["bankAccountCode"]
+
+    gl_item_rows = []
+    failed_count = 0
+    # Per-transaction messages are only formatted when debug logging is enabled
+    log_debug = logger.isEnabledFor(logging.DEBUG)
+    for (index, transaction_id, bank_csv_file, bank_csv_row_no, amount, description, gl_account, bp,
+         transaction_date, posting_year, posting_period, transaction_amount, debit_credit_indicator,
+         offsetting_debit_credit_indicator, investment_name, investment_symbol, check_no) in zip(
+        bank_transactions.index.tolist(),
+        bank_transactions['TransactionID'].tolist(),
+        bank_transactions['CSVFile'].tolist(),
+        bank_transactions['RowIndex'].tolist(),
+        bank_transactions['Amount'].tolist(),
+        bank_transactions['Description'].tolist(),
+        gl_accounts,
+        bps,
+        transaction_dates,
+        posting_years,
+        posting_periods,
+        transaction_amounts,
+        debit_credit_indicators,
+        offsetting_debit_credit_indicators,
+        investment_names,
+        investment_symbols,
+        check_nos
+    ):
+        account_properties = account_properties_by_id[gl_account]
         if not account_properties:
-            raise ValueError(f"Account properties not found for GL account: {gl_mapping['glAccount']}")
-
-        if debit_credit_indicator == self.constants.get('dcIndicators')['debit']:
-            transaction_amount = abs(self.bank_transaction_record.Amount)
-        else:
-            transaction_amount = -abs(self.bank_transaction_record.Amount)
-
-        gl_item = GLItem(
-            transaction_id=self.bank_transaction_record.TransactionID,
-            transaction_item_id="001",
-            bank_csv_file=self.bank_transaction_record.CSVFile,
-            bank_csv_row_no=self.bank_transaction_record.RowIndex,
-            transaction_date=self.bank_transaction_record.Date.to_pydatetime(),
-            posting_year=self.bank_transaction_record.Date.year,
-            posting_period=self.bank_transaction_record.Date.month,
-            transaction_amount=transaction_amount,
-            currency_unit=self.bank_account.properties["currencyUnit"],
-            debit_credit_indicator=debit_credit_indicator,
-            transaction_description=self.bank_transaction_record.Description,
-            account_id=gl_mapping["glAccount"],
-            business_partner=gl_mapping["bp"],
-            bank_account_code=self.bank_account.properties["bankAccountCode"],
-            investment_name=investment_name,
-            investment_symbol=investment_symbol,
-            check_no=check_no,
-            account_type=account_properties["accountType"],
-            is_taxable=account_properties["isTaxable"]
-        )
-        self.items.append(gl_item)
-
-    def _add_offsetting_gl_item(self):
-        offsetting_transaction_item_id = "002"
-        offsetting_transaction_amount = -self.items[0].transaction_amount
-        offsetting_debit_credit_indicator = (
-            "C" if self.items[0].debit_credit_indicator == "D" else "D"
-        )
-        offsetting_account_id = self.bank_account.properties["balanceSheetAccount"]
-
-        account_properties = self.chart_of_accounts.get_account_properties(offsetting_account_id)
-
-        offsetting_gl_item = GLItem(
-            transaction_id=self.items[0].transaction_id,
-            transaction_item_id=offsetting_transaction_item_id,
-            bank_csv_file=self.items[0].bank_csv_file,
-            bank_csv_row_no=self.items[0].bank_csv_row_no,
-            transaction_date=self.items[0].transaction_date,
-            posting_year=self.items[0].posting_year,
-            posting_period=self.items[0].posting_period,
-            transaction_amount=offsetting_transaction_amount,
-            currency_unit=self.items[0].currency_unit,
-            debit_credit_indicator=offsetting_debit_credit_indicator,
-            transaction_description=self.items[0].transaction_description,
-            account_id=offsetting_account_id,
-            business_partner=self.items[0].business_partner,
-            bank_account_code=self.items[0].bank_account_code,
-            investment_name=self.items[0].investment_name,
-            investment_symbol=self.items[0].investment_symbol,
-            check_no=self.items[0].check_no,
-            account_type=account_properties["accountType"],
-            is_taxable=account_properties["isTaxable"]
-        )
-        self.items.append(offsetting_gl_item)
-
-    def insert_gl_items_into_db(self, glDb: Database):
-        """
-        Inserts General Ledger (GL) items into the database.
-
-        This method calculates the total amount of all GL items and ensures that the total is zero.
-        It then inserts each GL item into the `gl_items` table in the database.
-
-        Args:
-            glDb (Database): The database connection object.
-
-        Raises:
-            AssertionError: If the total amount of GL items is not zero.
-
-        """
-        total_amount = sum(item.transaction_amount for item in self.items)
-        assert total_amount == 0, f"Total GL item amounts must be zero, but got {total_amount}"
-
-        for item in self.items:
-            glDb.cursor.execute(
-            f"""
-            INSERT INTO gl_items (
-                transaction_id,
-                transaction_item_id,
-                bank_csv_file,
-                bank_csv_row_no,
-                transaction_date,
-                posting_year,
-                posting_period,
-                transaction_amount,
-                currency_unit,
-                debit_credit_indicator,
-                transaction_description,
-                account_id,
-                business_partner,
-                bank_account_code,
-                investment_name,
-                investment_symbol,
-                check_no,
-                account_type,
-                is_taxable
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                item.transaction_id,
-                item.transaction_item_id,
-                item.bank_csv_file,
-                item.bank_csv_row_no,
-                item.transaction_date,
-                item.posting_year,
-                item.posting_period,
-                item.transaction_amount,
-                item.currency_unit,
-                item.debit_credit_indicator,
-                item.transaction_description,
-                item.account_id,
-                item.business_partner,
-                item.bank_account_code,
-                item.investment_name,
-                item.investment_symbol,
-                item.check_no,
-                item.account_type,
-                item.is_taxable
-            ),
-            )
-        glDb.commit()
-
-    def _gl_items_exist(self, glDb: Database, transaction_id: str) -> bool:
-        glDb.cursor.execute(
-            f"""
-            SELECT COUNT(*) FROM gl_items WHERE transaction_id = ?
-        """,
-            (transaction_id,),
-        )
-        count = glDb.cursor.fetchone()[0]
-        return count > 0
+            logger.warning(f"Error processing transaction {index} / {amount} {description} : "
+                           f"Account properties not found for GL account: {gl_account}")
+            failed_count += 1
+            continue
+
+        if log_debug:
+            logger.debug(f"     Recording transaction {bank_csv_file} {bank_csv_row_no}: {amount} {description} : "
+                         f"{currency_unit} / {gl_account} - {offsetting_account_id}")
+
+        gl_item_rows.append((
+            transaction_id, "001", bank_csv_file, bank_csv_row_no, transaction_date, posting_year, posting_period,
+            transaction_amount, currency_unit, debit_credit_indicator, description, gl_account,
+            bp, bank_account_code, investment_name, investment_symbol, check_no,
+            account_properties["accountType"], account_properties["isTaxable"]
+        ))
+        gl_item_rows.append((
+            transaction_id, "002", bank_csv_file, bank_csv_row_no, transaction_date, posting_year, posting_period,
+            -transaction_amount, currency_unit, offsetting_debit_credit_indicator, description, offsetting_account_id,
+            bp, bank_account_code, investment_name, investment_symbol, check_no,
+            offsetting_account_properties["accountType"], offsetting_account_properties["isTaxable"]
+        ))
+
+    return gl_item_rows, failed_count
@@ -8,40 +8,48 @@ bank accounts, database operations, GL items, and document processing.
 Modules:
 - bank_account: For handling bank account properties.
 - database: For database operations.
-- gl_item: For GL item handling.
-- gl_document: For GL document processing.
-- bank_csv_reader: For reading and iterating over bank transaction CSV files.
+- gl_document: For building the GL documents of a bank file.
+- bank_files: For reading and iterating over bank transaction CSV files.
 - GlToExcelWriter: For writing GL items to an Excel sheet.
 """
 
 # Libraries
+import functools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 from bank_account import BankAccounts, BankAccount
 from database import Database
-from gl_item import GLItem
-from gl_document import GLDocument
-from bank_files import BankFilesIterator, BankFileTransactions
+from gl_document import build_gl_item_rows
+from bank_files import iter_bank_files, BankFileTransactions
 from gl_to_excel_writer import GlToExcelWriter
 from constants import Constants
 from chart_of_accounts import ChartOfAccounts
 
+logger = logging.getLogger(__name__)
+
 class GLProcessor:
+    constants_file_path: str
     constants: Constants
     bank_accounts: BankAccounts
-    chart_of_accounts: ChartOfAccounts
     micro_gl_db: Database
+    gl_items_table_name: str
+    bank_files_folder_path: str
 
     def __init__(self, constants_file_path: str):
+        self.constants_file_path = constants_file_path
         self.constants = Constants(constants_file_path=constants_file_path)
         self.bank_accounts = BankAccounts(self.constants.get('bankAccountPropertiesFilePath'))
-        self.chart_of_accounts = ChartOfAccounts(self.constants.get('chartOfAccountsFilePath'))
         self.micro_gl_db = Database(self.constants.get('gldbFilePath'))
+        # Look up the constants used during processing once
+        self.gl_items_table_name = self.constants.get("gldbGlItemsTableName")
+        self.bank_files_folder_path = self.constants.get("bankFilesFolderPath")
 
     def refresh_gl_items_table(self):
         """
-        Drops the GL items table and recreates it.
+        Empties the GL items table, recreating it if its schema has changed.
         """
-        self.micro_gl_db.drop_table(self.constants.get("gldbGlItemsTableName"))
-        self.micro_gl_db.create_gl_table(self.constants.get("gldbGlItemsTableName"))
+        self.micro_gl_db.reset_gl_table(self.gl_items_table_name)
 
     def close_gldb(self):
         """
@@ -49,59 +57,97 @@ class GLProcessor:
         """
         self.micro_gl_db.close()
 
-    def process_bank_transaction_csv_files(self):
-        # Use BankCSVIterator to iterate over CSV files and print bank account codes and file paths
-        bank_files_iterator = BankFilesIterator(self.constants.get("bankFilesFolderPath"))
-        for bank_account_code, csv_file_path in bank_files_iterator:
-            print(f"Bank Account Code: {bank_account_code}, CSV File Path: {csv_file_path}")
-            try:
-                bank_account = BankAccount(
-                    bank_accounts=self.bank_accounts,
-                    bank_account_code=bank_account_code
-                )
-            except ValueError as e:
-                print(f"Error: {e}")
-                continue
-            bank_transactions = BankFileTransactions(
-                bank_account_code = bank_account_code, 
-                csv_file_path = csv_file_path, 
-                bank_account = bank_account
-                )
-            self._record_bank_file_transactions_in_GL(bank_transactions)
-
-    def _record_bank_file_transactions_in_GL(self, bank_transactions: BankFileTransactions):
-        for (
-            index,
-            bank_transaction,
-        ) in bank_transactions.bank_transactions.iterrows():
-            
-            print(f"--- Processing transaction {bank_transaction.CSVFile} {bank_transaction.RowIndex}: "
-                  f"{bank_transaction.Amount} {bank_transaction.Description}")
-        
-            try:
-                gl_document = GLDocument(
-                    bank_transaction, 
-                    bank_transactions.bank_account, 
-                    self.chart_of_accounts, 
-                    self.constants  # Pass constants to GLDocument
-                )
-            except ValueError as e:
-                print(f"Error processing transaction {index} / {bank_transaction.Amount} {bank_transaction.Description} : {e}")
-                continue
-
-            print(f"     Recording transaction {bank_transaction.CSVFile} {bank_transaction.RowIndex}: "
-                  f"{bank_transaction.Amount} {bank_transaction.Description} : "
-                  f"{gl_document.items[1].currency_unit} / "
-                  f"{gl_document.items[0].account_id} - {gl_document.items[1].account_id}")
-        
-            if not gl_document._gl_items_exist(self.micro_gl_db, transaction_id=bank_transaction.TransactionID):
-                gl_document.insert_gl_items_into_db(self.micro_gl_db)
-            else:
-                print(f"Transaction {bank_transaction.CSVFile} {bank_transaction.RowIndex} is already in the database.")
-
-    def write_gl_items_to_excel(self):
+    def process_bank_transaction_csv_files(self, max_workers: Optional[int] = None):
+        """
+        Reads the bank transaction CSV files in parallel worker processes and records their transactions in the GL.
+
+        Each file is independent, so the CSV parsing and GL document creation run in a process pool
+        (max_workers defaults to the number of CPUs). The workers return the GL item rows and this
+        process remains the only writer to the database.
+        """
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            bank_file_futures = []
+            # Iterate over the CSV files and log bank account codes and file paths
+            for bank_account_code, csv_file_path in iter_bank_files(self.bank_files_folder_path):
+                logger.info(f"Bank Account Code: {bank_account_code}, CSV File Path: {csv_file_path}")
+                try:
+                    self.bank_accounts.get_bank_account(bank_account_code)
+                except ValueError as e:
+                    logger.error(f"Error: {e}")
+                    continue
+                bank_file_futures.append((
+                    csv_file_path,
+                    executor.submit(build_bank_file_gl_item_rows, self.constants_file_path, bank_account_code, csv_file_path)
+                ))
+
+            # Record the results in file order, so that a transaction contained in several files
+            # is always recorded from the same file. All files are recorded in a single transaction.
+            # The GL items table is rebuilt from the bank files on every run, so the load skips syncing to disk.
+            with self.micro_gl_db.bulk_mode(), self.micro_gl_db.transaction():
+                for csv_file_path, bank_file_future in bank_file_futures:
+                    gl_item_rows, failed_count = bank_file_future.result()
+                    self._record_bank_file_transactions_in_GL(csv_file_path, gl_item_rows, failed_count)
+
+    def _record_bank_file_transactions_in_GL(self, csv_file_path: str, gl_item_rows: list, failed_count: int):
+        # Insert the GL items of all transactions in the file with one statement;
+        # items of transactions already in the database are ignored by SQLite
+        inserted_count = self.micro_gl_db.insert_gl_items_bulk(self.gl_items_table_name, gl_item_rows)
+
+        logger.info(f"{csv_file_path}: {inserted_count} GL items recorded, "
+                    f"{len(gl_item_rows) - inserted_count} already in the database, {failed_count} transactions failed.")
+
+    def write_gl_items_to_excel(self, write_only: bool = False):
         """
         Reads the GL items from the database and adds them to a specified Excel sheet table.
+        With write_only=True the items are streamed into a separate new workbook instead (see GlToExcelWriter).
         """
-        excel_writer = GlToExcelWriter()
+        excel_writer = GlToExcelWriter(self.constants, write_only=write_only)
         excel_writer.write_gl_items_to_excel()
+
+
+def build_bank_file_gl_item_rows(constants_file_path: str, bank_account_code: str, csv_file_path: str) -> tuple:
+    """
+    Reads a bank transaction CSV file and creates the GL documents for its transactions.
+
+    This function runs in a worker process of GLProcessor.process_bank_transaction_csv_files. It loads the
+    configuration from the constants file itself and does not touch the database: the GL items are returned
+    as rows so that the main process can insert them.
+
+    Returns:
+        tuple: The GL item rows of all GL documents, and the number of transactions for which
+        no GL document could be created.
+    """
+    constants = _load_constants(constants_file_path)
+    bank_account = _load_bank_account(constants.get('bankAccountPropertiesFilePath'), bank_account_code)
+    chart_of_accounts = _load_chart_of_accounts(constants.get('chartOfAccountsFilePath'))
+    bank_transactions = BankFileTransactions(
+        bank_account_code = bank_account_code, 
+        csv_file_path = csv_file_path, 
+        bank_account = bank_account
+        )
+
+    # The GL documents of all transactions of the file are built column-wise in one pass
+    return build_gl_item_rows(bank_transactions.bank_transactions, bank_account, chart_of_accounts, constants)
+
+
+# Worker processes are reused for several bank files, so the configuration files are parsed
+# only once per process and bank accounts are shared between files of the same account.
+
+@functools.lru_cache(maxsize=None)
+def _load_constants(constants_file_path: str) -> Constants:
+    return Constants(constants_file_path=constants_file_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_bank_accounts(property_file_path: str) -> BankAccounts:
+    return BankAccounts(property_file_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_bank_account(property_file_path: str, bank_account_code: str) -> BankAccount:
+    return BankAccount(bank_accounts=_load_bank_accounts(property_file_path), bank_account_code=bank_account_code)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_chart_of_accounts(json_file_path: str) -> ChartOfAccounts:
+    return ChartOfAccounts(json_file_path)
@@ -1,25 +1,54 @@
+import os
+import warnings
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl import Workbook, load_workbook
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+from openpyxl.utils import get_column_letter
 from database import Database
-import json
+from constants import Constants
+
+# Number of rows fetched from SQLite per round trip in write-only mode
+FETCH_BATCH_SIZE = 10_000
+
+def _column_width(values: pd.Series, title: str) -> int:
+    # Longest value or title plus some padding; the lengths are computed vectorized, missing values are skipped
+    if pd.api.types.is_integer_dtype(values.dtype) and values.count():
+        # The longest integer is the smallest or the largest one, no strings are needed
+        max_length = max(len(str(values.min())), len(str(values.max())))
+    else:
+        max_length = values.astype('string').str.len().max()
+    return max(0 if pd.isna(max_length) else int(max_length), len(title)) + 2
 
 class GlToExcelWriter:
-    def __init__(self):
-        # Load constants from JSON file
-        with open('Configuration/constants.json') as f:
-            constants = json.load(f)
-        
-        self.db_path = constants['gldbFilePath']
-        self.excel_path = constants['excelWriter']['excelPath']
-        self.sheet_name = constants['excelWriter']['sheetName']
-        self.table_name = constants['excelWriter']['tableName']
-        self.gl_items_table_name = constants['gldbGlItemsTableName']
+    def __init__(self, constants: Constants, write_only: bool = False):
+        """
+        constants (Constants): The configuration constants, already loaded by the caller.
+        write_only (bool): Stream the GL items into a new workbook with openpyxl's write-only mode
+            instead of adding them to the existing workbook. Memory use stays constant for large GLs,
+            but the new workbook only contains the GL items sheet, so it is saved to
+            excelWriter.writeOnlyExcelPath (default: <excelPath>_gl_items.xlsx).
+        """
+        self.write_only = write_only
+
+        excel_writer_constants = constants.get('excelWriter')
+        self.db_path = constants.get('gldbFilePath')
+        self.excel_path = excel_writer_constants['excelPath']
+        self.sheet_name = excel_writer_constants['sheetName']
+        self.table_name = excel_writer_constants['tableName']
+        self.gl_items_table_name = constants.get('gldbGlItemsTableName')
+        self.write_only_excel_path = excel_writer_constants.get(
+            'writeOnlyExcelPath', f"{os.path.splitext(self.excel_path)[0]}_gl_items.xlsx"
+        )
 
     def write_gl_items_to_excel(self):
         """
         Reads the GL items from the database and adds them to a specified Excel sheet table.
         """
+        if self.write_only:
+            self._stream_gl_items_to_new_workbook()
+            return
+
         gl_items = self._read_gl_items_from_db()
         self._write_and_add_table_to_excel(gl_items)
 
@@ -31,26 +60,34 @@ class GlToExcelWriter:
         query = f"SELECT * FROM {self.gl_items_table_name}"
         gl_items = pd.read_sql_query(query, db.connection)
         db.close()
+        # The amounts are stored in cents, convert them to currency units for the sheet
+        gl_items['transaction_amount'] = gl_items['transaction_amount'] / 100
         return gl_items
 
     def _write_and_add_table_to_excel(self, gl_items):
         """
         Writes the DataFrame data to the specified Excel sheet and adds a table.
+        The workbook is loaded and saved only once. An existing sheet is kept with its settings (e.g. freeze
+        panes, conditional formatting, tab colour): only its previous table and cells are removed before the
+        rows are appended to it directly.
         """
-        with pd.ExcelWriter(self.excel_path, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
-            gl_items.to_excel(writer, sheet_name=self.sheet_name, index=False)
-
         book = load_workbook(self.excel_path)
-        sheet = book[self.sheet_name]
-        
-        # Remove the existing table if it exists
-        existing_tables = [tbl for tbl in sheet.tables.values() if tbl.displayName == self.table_name]
-        for tbl in existing_tables:
-            del sheet.tables[tbl.displayName]
+        if self.sheet_name in book.sheetnames:
+            sheet = book[self.sheet_name]
+            if self.table_name in sheet.tables:
+                del sheet.tables[self.table_name]
+            sheet.delete_rows(1, sheet.max_row)
+        else:
+            sheet = book.create_sheet(self.sheet_name)
+
+        sheet.append(list(gl_items.columns))
+        # Missing values become empty cells
+        for row in gl_items.astype(object).where(gl_items.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
         
         # Define the table range
         (max_row, max_col) = gl_items.shape
-        table_range = f"A1:{chr(65 + max_col - 1)}{max_row + 1}"
+        table_range = f"A1:{get_column_letter(max_col)}{max_row + 1}"
         
         # Create a table
         table = Table(displayName=self.table_name, ref=table_range)
@@ -65,11 +102,64 @@ class GlToExcelWriter:
         
         # Set the column width for better visibility
         for i, col in enumerate(gl_items.columns):
-            max_len = max(gl_items[col].astype(str).map(len).max(), len(col)) + 2
-            sheet.column_dimensions[chr(65 + i)].width = max_len
+            sheet.column_dimensions[get_column_letter(i + 1)].width = _column_width(gl_items[col], col)
         
         # Save the workbook
         book.save(self.excel_path)
 
         # Notify the user
         print(f"GL items written to {self.excel_path} in the sheet '{self.sheet_name}' with table '{self.table_name}'.")
+
+    def _stream_gl_items_to_new_workbook(self):
+        """
+        Streams the GL items from the database into a new write-only workbook and adds a table.
+        Rows are fetched in batches and written straight to the sheet, so the GL is never held in memory.
+        """
+        db = Database(self.db_path)
+
+        # Column widths must be set before the first row is written, so let SQLite compute them upfront.
+        # The amounts are measured in currency units as written to the sheet; SQLite renders the REAL
+        # values like Python's str(float), so the widths match those of the default mode.
+        columns = [column[1] for column in db.connection.execute(f"PRAGMA table_info({self.gl_items_table_name})")]
+        length_expressions = [
+            f"MAX(LENGTH({col} / 100.0))" if col == 'transaction_amount' else f"MAX(LENGTH({col}))" for col in columns
+        ]
+        max_lengths = db.connection.execute(
+            f"SELECT COUNT(*), {', '.join(length_expressions)} FROM {self.gl_items_table_name}"
+        ).fetchone()
+        row_count = max_lengths[0]
+
+        book = Workbook(write_only=True)
+        sheet = book.create_sheet(self.sheet_name)
+        for i, col in enumerate(columns):
+            sheet.column_dimensions[get_column_letter(i + 1)].width = max(max_lengths[i + 1] or 0, len(col)) + 2
+
+        sheet.append(columns)
+        amount_index = columns.index('transaction_amount')
+        cursor = db.connection.execute(f"SELECT * FROM {self.gl_items_table_name}")
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                row = list(row)
+                # The amounts are stored in cents, convert them to currency units as in the default mode
+                row[amount_index] = row[amount_index] / 100
+                sheet.append(row)
+        db.close()
+
+        # Write-only sheets cannot derive the table columns from the cells, so define them explicitly
+        table_range = f"A1:{get_column_letter(len(columns))}{row_count + 1}"
+        table = Table(displayName=self.table_name, ref=table_range)
+        table.tableColumns = [TableColumn(id=i + 1, name=col) for i, col in enumerate(columns)]
+        table.autoFilter = AutoFilter(ref=table_range)
+        table.tableStyleInfo = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
+                                              showLastColumn=False, showRowStripes=True, showColumnStripes=True)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="In write-only mode you must add table columns manually")
+            sheet.add_table(table)
+
+        book.save(self.write_only_excel_path)
+
+        # Notify the user
+        print(f"GL items written to {self.write_only_excel_path} in the sheet '{self.sheet_name}' with table '{self.table_name}'.")
@@ -10,6 +10,7 @@ Modules:
 """
 
 # Libraries
+import logging
 from gl_processor import GLProcessor  
 
 # Main program:
@@ -19,6 +20,8 @@ from gl_processor import GLProcessor
 micro_gl_processor: GLProcessor
 
 if __name__ == "__main__":
+    # Per-file summaries are logged at INFO; set the level to DEBUG to trace every transaction
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     micro_gl_processor = GLProcessor(constants_file_path='./Configuration/constants.json')
     micro_gl_processor.refresh_gl_items_table()
     micro_gl_processor.process_bank_transaction_csv_files()